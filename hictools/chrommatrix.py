@@ -1,5 +1,5 @@
 """Interface."""
-from functools import partial, lru_cache, singledispatch, cached_property
+from functools import partial, singledispatch, cached_property
 from typing import Union, Tuple, Any, TypeVar
 
 import numpy as np
@@ -9,7 +9,7 @@ from scipy import sparse
 Array = Union[np.ndarray, sparse.spmatrix]
 
 from .utils.numtools import get_diag, fill_diags, Expected
-from .utils.utils import suppress_warning, MethodWrapper
+from .utils.utils import suppress_warning, lazy_method, MethodWrapper
 
 
 @singledispatch
@@ -200,7 +200,7 @@ class ChromMatrix(object):
 
         return observed
 
-    @lru_cache(maxsize=3)
+    @lazy_method
     @suppress_warning
     def mean(self,
              balance: bool = True,
@@ -223,7 +223,7 @@ class ChromMatrix(object):
 
         return mean_array.astype(np.float32)
 
-    @lru_cache(maxsize=3)
+    @lazy_method
     @suppress_warning
     def std(self,
             balance: bool = True,
@@ -251,9 +251,11 @@ class ChromMatrix(object):
         """Calculate expected count of each interaction across a certain distance."""
         return self.mean(balance=self.config.get("balance", True))
 
-    def expected(self) -> Expected:
-        """Calculate expected matrix that pixels in a certain diagonal have the same value."""
-        return Expected(self.decay())
+    def expected(self, writeable: bool = False) -> Expected:
+        """Calculate expected matrix that pixels in a certain diagonal have the same value.
+        Slices of the returned matrix are read-only views unless writeable is True.
+        """
+        return Expected(self.decay(), writeable=writeable)
 
     @suppress_warning
     def oe(self,
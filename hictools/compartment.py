@@ -25,14 +25,12 @@ def get_eigen_compartment(mat: np.ndarray, vecnum: int = 3, subtract_mean=False,
     :return type: np.ndarray. Positive values represent A compartment and negative values represent B compartment.
     """
     if subtract_mean or divide_by_mean:
-        mat = mat.copy()
-        mean = np.mean(mat)
-        if subtract_mean:
-            mat -= mean
-        else:
-            mat /= mean
+        # out-of-place ufunc allocates and computes in a single pass instead of copy + in-place op.
+        op = np.subtract if subtract_mean else np.divide
+        mat = op(mat, np.mean(mat))
 
-    _, eigvecs = eig(mat, vecnum=vecnum)
+    # hic contact matrices are symmetric, skip the check.
+    _, eigvecs = eig(mat, vecnum=vecnum, symmetric=True)
 
     return eigvecs
 
@@ -46,14 +44,20 @@ def corr_sorter(eigvecs: np.ndarray, corr: np.ndarray):
             In general, the interactions within A are stronger than the interactions within B.
     """
 
-    def mean_corr(mat, compartment):
+    # nan-aware means over sub blocks are computed as a.T @ mat @ b with indicator vectors a and b.
+    valid = ~np.isnan(corr)
+    values = np.where(valid, corr, 0)
+    counts = valid.astype(values.dtype)
+
+    def mean_corr(compartment):
 
-        com_mask1 = compartment > 0
-        com_mask2 = compartment < 0
+        com_a = (compartment > 0).astype(values.dtype)
+        com_b = (compartment < 0).astype(values.dtype)
+        values_b, counts_b = values @ com_b, counts @ com_b
         return (
-            np.nanmean(mat[np.ix_(com_mask1, com_mask1)]),
-            np.nanmean(mat[np.ix_(com_mask2, com_mask2)]),
-            np.nanmean(mat[np.ix_(com_mask1, com_mask2)])
+            com_a @ (values @ com_a) / (com_a @ (counts @ com_a)),
+            com_b @ values_b / (com_b @ counts_b),
+            com_a @ values_b / (com_a @ counts_b)
         )
 
     coms = []
@@ -74,7 +78,7 @@ def corr_sorter(eigvecs: np.ndarray, corr: np.ndarray):
         else:
             possible = True
 
-        mean_aa, mean_bb, mean_ab = mean_corr(mat=corr, compartment=component)
+        mean_aa, mean_bb, mean_ab = mean_corr(compartment=component)
 
         coms.append(
             (
@@ -1,14 +1,40 @@
-import itertools
+import asyncio
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
-from pathlib import Path
 
+import orjson
 import uvicorn
 from fastapi import FastAPI, Query
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import UJSONResponse
+from starlette.responses import Response, StreamingResponse
 
 from hictools.hgserver.store import TileSetDB, TileSet
 
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+# Tilesets rarely change, cache query results for a few seconds.
+QUERY_CACHE_TTL = 5.
+QUERY_CACHE_SIZE = 128
+
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def stream_json(items):
+    """Encode (key, value) pairs as a json object piece by piece, avoid building one giant dict."""
+    yield b'{'
+    for index, (key, value) in enumerate(items):
+        if index:
+            yield b','
+        yield orjson.dumps(key, option=ORJSON_OPTIONS) + b':' + orjson.dumps(value, option=ORJSON_OPTIONS)
+    yield b'}'
+
 
 def create_app(db):
     app = FastAPI()
@@ -19,6 +45,7 @@ def create_app(db):
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    tiles_executor = ThreadPoolExecutor()
 
     @app.on_event("startup")
     async def startup_event():
@@ -27,22 +54,52 @@ def create_app(db):
     @app.on_event("shutdown")
     async def shutdown_event():
         await db.disconnect()
+        tiles_executor.shutdown(wait=False)
 
     # **************************************db dependant operation********************************#
+    query_cache = {}
+    # keep references of fire-and-forget tasks, otherwise they may be garbage collected before finishing.
+    background_tasks = set()
+
     async def fetch_tilesets(**kwargs):
+        key = tuple(sorted(
+            (k, tuple(v) if isinstance(v, list) else v)
+            for k, v in kwargs.items()
+        ))
+        now = time.monotonic()
+        cached = query_cache.get(key)
+        if cached is not None and now - cached[0] < QUERY_CACHE_TTL:
+            return dict(cached[1])
+
         tilesets = await db.query(**kwargs)
-        uuids_remove = []
-        for uuid in list(tilesets.keys()):
-            if not Path(tilesets[uuid]['datafile']).exists():
+        # check files concurrently in threads instead of blocking the event loop with each stat call.
+        loop = asyncio.get_running_loop()
+        exists = await asyncio.gather(*(
+            loop.run_in_executor(None, os.path.exists, tileset['datafile'])
+            for tileset in tilesets.values()
+        ))
+        existed_tilesets, uuids_remove = {}, []
+        for (uuid, tileset), exist in zip(tilesets.items(), exists):
+            if exist:
+                existed_tilesets[uuid] = tileset
+            else:
                 uuids_remove.append(uuid)
-                del tilesets[uuid]
-        await db.remove(uuids_remove)
-        return tilesets
+        tilesets = existed_tilesets
+        if uuids_remove:
+            # removal doesn't affect the response, don't wait for it.
+            task = asyncio.ensure_future(db.remove(uuids_remove))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+
+        if len(query_cache) >= QUERY_CACHE_SIZE:
+            query_cache.pop(next(iter(query_cache)))
+        query_cache[key] = (now, tilesets)
+        return dict(tilesets)
 
     # *******************************************************************************************#
 
     # handling ordered by through fetch_tilesets
-    @app.get('/api/v1/tilesets/', response_class=UJSONResponse)
+    @app.get('/api/v1/tilesets/', response_class=ORJSONResponse)
     async def list_tilesets(limit: int = Query(None),
                             datatype: List[str] = Query(None, alias="dt"),
                             filetype: List[str] = Query(None, alias="t")
@@ -56,11 +113,11 @@ def create_app(db):
                         for tileset in tilesets.values()]
         }
 
-    @app.get('/api/v1/chrom-sizes/', response_class=UJSONResponse)
+    @app.get('/api/v1/chrom-sizes/', response_class=ORJSONResponse)
     async def chromsizes():
         pass
 
-    @app.get('/api/v1/tileset_info/', response_class=UJSONResponse)
+    @app.get('/api/v1/tileset_info/', response_class=ORJSONResponse)
     async def tileset_info(uuids: List[str] = Query(None, alias="d")):
         tilesets = await fetch_tilesets(uuid=uuids)
         existed_uuids = set(uuids) & set(tilesets.keys())
@@ -71,26 +128,45 @@ def create_app(db):
 
         return info
 
-    @app.get('/api/v1/tiles/', response_class=UJSONResponse)
+    @app.get('/api/v1/tiles/', response_class=ORJSONResponse)
     async def tiles(uuids: List[str] = Query(..., alias="d")):
-        uuid_tids = {uuid: list(tids)
-                     for uuid, tids
-                     in itertools.groupby(uuids, lambda x: x.split('.')[0])}
+        # tile ids of the same tileset are not guaranteed to be adjacent, groupby would split them.
+        uuid_tids = defaultdict(list)
+        for tid in uuids:
+            uuid_tids[tid.split('.', 1)[0]].append(tid)
         tilesets = await fetch_tilesets(uuid=list(uuid_tids.keys()))
-        tiles_list = [TileSet.tiles(tilesets[uuid], uuid_tids[uuid])
-                      for uuid in tilesets]
 
-        return {tid: tile
-                for uuid_tiles in tiles_list
-                for tid, tile in uuid_tiles}
+        # Fetch different datafiles in parallel threads. File handles(e.g. hdf5) are not thread safe,
+        # tilesets sharing the same datafile are handled sequentially in one thread.
+        datafile_uuids = defaultdict(list)
+        for uuid, tileset in tilesets.items():
+            datafile_uuids[tileset['datafile']].append(uuid)
+
+        def fetch_tiles(uuids_):
+            return [tid_tile
+                    for uuid in uuids_
+                    for tid_tile in TileSet.tiles(tilesets[uuid], uuid_tids[uuid])]
+
+        loop = asyncio.get_running_loop()
+        tiles_list = await asyncio.gather(*(
+            loop.run_in_executor(tiles_executor, fetch_tiles, uuids_)
+            for uuids_ in datafile_uuids.values()
+        ))
+
+        return StreamingResponse(
+            stream_json(tid_tile
+                        for uuid_tiles in tiles_list
+                        for tid_tile in uuid_tiles),
+            media_type=ORJSONResponse.media_type
+        )
 
     @app.post('/api/v1/tilesets/')
     async def append_tilesets():
-        pass
+        query_cache.clear()
 
     @app.post('/api/v1/chrom-sizes/')
     async def append_chrom_sizes():
-        pass
+        query_cache.clear()
 
     return app
 
@@ -1,5 +1,5 @@
 """Tools for Loop-detection analysis."""
-from multiprocessing import Pool
+from concurrent.futures.process import BrokenProcessPool
 from typing import Tuple, Sequence, Iterator
 from dataclasses import dataclass
 
@@ -9,7 +9,7 @@ from scipy import ndimage, stats, sparse
 from sklearn.cluster import DBSCAN
 from statsmodels.stats import multitest
 
-from .utils.utils import CPU_CORE, suppress_warning
+from .utils.utils import CPU_CORE, get_pool, drop_pool, suppress_warning
 from .utils.numtools import mask_array, index_array, Toeplitz
 from .chrommatrix import ChromMatrix, Array
 
@@ -43,13 +43,17 @@ class HiccupsPeaksFinder(object):
         )
 
         # fetching backgrounds model for nonzero pixles for each chunk for 4 kernels
-        with Pool(processes=self.num_cpus) as pool:
-            params = (
-                (observed[s1, s2], (decay[s1], decay[s2]), (1 / weights[s1], 1 / weights[s2]),
-                 self.kernels, self.band_width)
-                for s1, s2 in chunks
-            )
-            backgounds = pool.starmap(self.calculate_chunk, params)
+        params = [
+            (observed[s1, s2], (decay[s1], decay[s2]), (1 / weights[s1], 1 / weights[s2]),
+             self.kernels, self.band_width)
+            for s1, s2 in chunks
+        ]
+        try:
+            backgounds = list(get_pool(self.num_cpus).map(self.calculate_chunk, *zip(*params)))
+        except BrokenProcessPool:
+            # a worker died and the shared pool refuses new tasks, let the next call start a new one.
+            drop_pool(self.num_cpus)
+            raise
 
         # indices are 0-based, plus onto the start index in the original matrix
         for (indices, *_), chunk in zip(backgounds, chunks):
@@ -148,10 +152,9 @@ class HiccupsPeaksFinder(object):
         try:
             if isinstance(observed, sparse.spmatrix):
                 observed = observed.toarray()
-            expected = Toeplitz(*exps)[:]
             observed[np.isnan(observed)] = 0
             zero_region = observed == 0
-            expected[zero_region] = 0
+            expected = np.where(zero_region, 0, Toeplitz(*exps)[:])
 
             # calculate lambda array for all nonzero pixels in valid region under each kernel
             x, y = observed.nonzero()
@@ -318,13 +321,12 @@ class HiccupsPeaksFinder(object):
 
         def away_gap_mask(indices, gap_mask, extend_width) -> np.ndarray:
             """Return mask of valid peaks away from gap regions."""
-            for _ in range(extend_width):
-                gap_mask |= np.r_[gap_mask[1:], [False]]
-                gap_mask |= np.r_[[False], gap_mask[: -1]]
-            gap_region = set(np.where(gap_mask)[0])
+            if extend_width > 0:
+                gap_mask = ndimage.binary_dilation(gap_mask, iterations=extend_width)
+            # indices may be upcasted to float when concatenated with empty chunks.
+            x, y = np.asarray(indices).astype(np.int64, copy=False)
 
-            return ~np.array([i in gap_region or j in gap_region
-                              for i, j in zip(*indices)])
+            return ~(gap_mask[x] | gap_mask[y])
 
         indices, contact_array, lambda_array, enrich_ratio, pvals, padjs, shapes = peaks
 
@@ -4,14 +4,21 @@ import os
 import shutil
 import subprocess
 from collections import OrderedDict, namedtuple
-from typing import Iterable, Tuple
+from typing import Iterable, Tuple, TYPE_CHECKING
 
 import h5py
 import numpy as np
-import pandas as pd
 
 from .utils import get_logger
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# looking up executables walks the whole PATH, do it only once.
+_HAS_SAMTOOLS = shutil.which('samtools') is not None
+_HAS_BGZIP = shutil.which('bgzip') is not None
+_HAS_IGZIP = shutil.which('igzip') is not None
+
 
 class auto_open(object):
     # TODO(zhongquan789@gmail.com)  1.Add log system. 2.Add exception handling. 3.Add stderr handling.
@@ -24,7 +31,10 @@ class auto_open(object):
                  mode: str = 'r',
                  nproc: int = 4,
                  command: str = None,
-                 convert: bool = True):
+                 convert: bool = True,
+                 level: int = None,
+                 pipe_to_pipe: bool = False,
+                 bgzf: bool = True):
         """
 
         :param file: str.  File name.
@@ -32,10 +42,16 @@ class auto_open(object):
         :param nproc: int. Numbers of process used for file format transversion. default: 1
         :param command: str. User defined command to replace default command. default: None
         :param convert: bool. If the automatically file format transversion is activated. default: True
+        :param level: int. Compression level used when writing gz file. default: None
+        :param pipe_to_pipe: bool. Write uncompressed bam when the output is only consumed by another tool. default: False
+        :param bgzf: bool. Write gz file in BGZF format, otherwise faster igzip is used if available. default: True
         """
 
         self._file = file
         self._nproc = nproc
+        self._level = level
+        self._pipe_to_pipe = pipe_to_pipe
+        self._bgzf = bgzf
         self._pipe = None
         self._stream = None
         self._convert = convert
@@ -70,44 +86,56 @@ class auto_open(object):
                 stdin=stdin,
                 stdout=stdout,
                 shell=True,
-                bufsize=-1,
+                bufsize=1 << 20,
                 universal_newlines=text
             )
 
     @classmethod
-    def _handle_bam(cls, file: str, mode: str, nproc: int) -> subprocess.Popen:
+    def _handle_bam(cls, file: str, mode: str, nproc: int, pipe_to_pipe: bool = False) -> subprocess.Popen:
         """
 
         :param file: str. Bam/Sam file name.
         :param mode: str. Mode used as the parameter mode in built-in function open.
         :param nproc: int. Numbers of process used in samtools.
+        :param pipe_to_pipe: bool. Write uncompressed bam(samtools view -u) for piping between tools. default: False
         :return:
         """
 
-        if shutil.which('samtools') is None:
+        if not _HAS_SAMTOOLS:
             raise ValueError('samtools not exist in PATH.')
 
         if mode[0] == 'w':
-            command = "samtools view -bS -@ {} -".format(nproc)
+            command = "samtools view {} -@ {} -".format('-u' if pipe_to_pipe else '-bS', nproc)
         else:
             command = "samtools view -h -@ {}".format(nproc)
 
         return cls._popen(command, file, mode)
 
     @classmethod
-    def _handle_gzip(cls, file: str, mode: str, nproc: int) -> subprocess.Popen:
-        """
+    def _handle_gzip(cls, file: str, mode: str, nproc: int,
+                     level: int = None, bgzf: bool = True) -> subprocess.Popen:
+        """igzip is preferred for reading and for writing when bgzf is False, bgzip is used otherwise.
+        Note that files written by igzip are plain gzip, not BGZF, and can not be indexed for random access.
 
         :param file: str. gz-end file or text file which will be converted to text and gz file respectively.
         :param mode: str. Mode used as the parameter mode in built-in function open.
-        :param nproc: int. Numbers pf process used in pbgzip.
+        :param nproc: int. Numbers pf process used in bgzip/igzip.
+        :param level: int. Compression level used when writing, igzip only supports 0-3. default: None
+        :param bgzf: bool. If the written file should be in BGZF format. default: True
         :return:
         """
-        if shutil.which('pbgzip') is None:
-            raise ValueError('pbgzip not found')
+        if _HAS_IGZIP and mode[0] == 'w' and not bgzf:
+            level_opt = '' if level is None else '-{} '.format(min(level, 3))
+            return cls._popen("igzip {}-c -T {}".format(level_opt, nproc), file, mode)
+        elif _HAS_IGZIP and mode[0] == 'r':
+            return cls._popen("igzip -dc -T {}".format(nproc), file, mode)
+
+        if not _HAS_BGZIP:
+            raise ValueError('bgzip not found')
 
         if mode[0] == 'w':
-            command = "bgzip -c -@ {}".format(nproc)
+            level_opt = '' if level is None else '-l {} '.format(level)
+            command = "bgzip {}-c -@ {}".format(level_opt, nproc)
         else:
             command = "bgzip -dc -@ {}".format(nproc)
 
@@ -120,10 +148,10 @@ class auto_open(object):
             self._pipe = self._popen(self.command, self._file, self.mode)
 
         elif self._convert and self._file.endswith("bam"):
-            self._pipe = self._handle_bam(self._file, self.mode, self._nproc)
+            self._pipe = self._handle_bam(self._file, self.mode, self._nproc, self._pipe_to_pipe)
 
         elif self._convert and self._file.endswith('gz'):
-            self._pipe = self._handle_gzip(self._file, self.mode, self._nproc)
+            self._pipe = self._handle_gzip(self._file, self.mode, self._nproc, self._level, self._bgzf)
 
         else:
             self._stream = open(self._file, self.mode)
@@ -161,24 +189,35 @@ class auto_open(object):
         return repr(self._stream)
 
 
-def stream_to_file(filename: str, stream):
-    """Read from stream and write into file named filename line by line.
+def stream_to_file(filename: str, stream, chunk_size: int = 128 * 1024):
+    """Read from stream and write into file named filename.
+    File-like streams are copied in chunks of chunk_size, other iterables are written line by line.
 
     :param filename: str. File name of the disired output file.
-    :param stream:
+    :param stream: File-like object or iterable of lines.
+    :param chunk_size: int. Size of each chunk read from a file-like stream. default: 131072
     :return:
     """
-    with auto_open(filename, 'w') as f:
-        for line in stream:
-            f.write(line)
+    if not hasattr(stream, 'read'):
+        with auto_open(filename, 'w') as f:
+            for line in stream:
+                f.write(line)
+        return
 
+    buf = stream.read(chunk_size)
+    with auto_open(filename, 'wb' if isinstance(buf, bytes) else 'w') as f:
+        while buf:
+            f.write(buf)
+            buf = stream.read(chunk_size)
 
-def records2bigwigs(df: pd.DataFrame, prefix: str):
+
+def records2bigwigs(df: 'pd.DataFrame', prefix: str):
     """ Dump dataframe to bigwig files
 
     :param df: records dataframe, contain fields: chrom, start, end.
     :param prefix: prefix of output bigwig files.
     """
+    import pandas as pd
     import pyBigWig
     required_fields = ['chrom', 'start', 'end']
     assert all((f in df) for f in required_fields), \
@@ -194,18 +233,26 @@ def records2bigwigs(df: pd.DataFrame, prefix: str):
             os.remove(path_)
         bigwigs[col] = pyBigWig.open(path_, 'w')
 
-    chroms = df['chrom'].drop_duplicates()
-    chroms2maxend = {chrom: df[df['chrom'] == chrom]['end'].max() for chrom in chroms}
+    # sort once by (chrom, start), keeping chromosomes in the order they first appear.
+    chrom_codes, _ = pd.factorize(df['chrom'])
+    df = df.iloc[np.lexsort((df['start'].to_numpy(), chrom_codes))]
+    chroms2maxend = df.groupby('chrom', sort=False)['end'].max().to_dict()
     headers = list(chroms2maxend.items())
     for bw in bigwigs.values():
         bw.addHeader(headers)
+
+    def to_array(series, dtype):
+        array = series.to_numpy(dtype=dtype)
+        # pyBigWig only accepts ndarray when it is built with numpy support.
+        return array if pyBigWig.numpy else array.tolist()
+
     for col in val_cols:
-        df_ = df[~df[col].isna()]
+        df_ = df.dropna(subset=[col])
         bigwigs[col].addEntries(
-            chroms=list(df_['chrom']),
-            starts=list(df_['start']),
-            ends=list(df_['end']),
-            values=list(df_[col])
+            chroms=df_['chrom'].values.tolist(),
+            starts=to_array(df_['start'], np.int64),
+            ends=to_array(df_['end'], np.int64),
+            values=to_array(df_[col], np.float64)
         )
 
     for bw in bigwigs.values():
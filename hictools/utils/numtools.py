@@ -1,7 +1,7 @@
 import numbers
 import itertools
-from functools import partial
-from typing import Union, Iterable, Callable, Generator, Sequence, Iterator
+from functools import partial, lru_cache
+from typing import Union, Iterable, Callable, Generator, Sequence, Iterator, Tuple, Optional
 
 import numpy as np
 from scipy import sparse, linalg
@@ -22,9 +22,18 @@ def is_symmetric(mat: Union[np.ndarray, sparse.spmatrix],
     :return: bool. True if the input matrix is symmetric.
     """
     if isinstance(mat, np.ndarray):
+        if mat.ndim != 2 or mat.shape[0] != mat.shape[1]:
+            return False
         data, data_t = mat, mat.T
+        if np.issubdtype(mat.dtype, np.integer) or mat.dtype == bool:
+            return np.array_equal(data, data_t)
+        # check a single off-diagonal pair before comparing the whole matrix.
+        if mat.shape[0] > 1 and not np.isclose(data[0, 1], data_t[0, 1], rtol=rtol, atol=atol, equal_nan=True):
+            return False
         return np.allclose(data, data_t, rtol=rtol, atol=atol, equal_nan=True)
     elif sparse.isspmatrix(mat):
+        if mat.shape[0] != mat.shape[1]:
+            return False
         mat = mat.copy()
         mat.data[np.isnan(mat.data)] = 0
         return (np.abs(mat - mat.T) > rtol).nnz == 0
@@ -39,14 +48,19 @@ def mask_array(mask, *args) -> Iterator[np.ndarray]:
     :param args: tuple. tuple of np.ndarray. Masking will be applied to each ndarray.
     :return: np.ndarray. A generator yield a masked ndarray each time.
     """
+    # translate boolean mask to indices once and reuse them for every array.
+    index = np.asarray(mask)
+    if index.dtype == bool:
+        index = np.flatnonzero(index)
+    elif index.size == 0:
+        # np.asarray([]) is float64, which take refuses as indices.
+        index = index.astype(np.intp)
+
     for mat in args:
         if isinstance(mat, (tuple, list)):
-            yield tuple(mask_array(mask, *mat))
+            yield tuple(mask_array(index, *mat))
         else:
-            if len(mat.shape) == 1:
-                yield mat[mask]
-            else:
-                yield mat[:, mask]
+            yield mat.take(index, axis=0 if mat.ndim == 1 else 1)
 
 
 def index_array(index, *args) -> Iterator[np.ndarray]:
@@ -63,10 +77,13 @@ def get_diag(mat: np.ndarray, offset: int = 0) -> np.ndarray:
     """Get view of a given diagonal of the 2d ndarray.\n
     Reference: https://stackoverflow.com/questions/9958577/changing-the-values-of-the-diagonal-of-a-matrix-in-numpy
     """
-    length = mat.shape[1]
-    st = max(offset, -length * offset)
-    ed = max(0, length - offset) * length
-    return mat.ravel()[st: ed: length + 1]
+    nrow, ncol = mat.shape
+    assert -nrow < offset < ncol, f"offset {offset} out of bounds for matrix of shape {mat.shape}."
+    if offset >= 0:
+        st, size = offset, min(nrow, ncol - offset)
+    else:
+        st, size = -offset * ncol, min(nrow + offset, ncol)
+    return mat.ravel()[st: st + max(size, 0) * (ncol + 1): ncol + 1]
 
 
 def fill_diags(mat: np.ndarray,
@@ -129,11 +146,78 @@ def apply_along_diags(func: Callable,
                 yield func(diag[filter_fn(diag)])
 
 
+_nonzero = partial(np.not_equal, 0.)
+
+
+def _diags_sum(mat, ignore_zero):
+    """Accumulate sums and counts of each upper diagonal by walking rows of mat once.
+    Compiled with numba by _jit_diags_sum.
+    """
+    length = mat.shape[1]
+    sums = np.zeros(length)
+    counts = np.zeros(length, dtype=np.int64)
+    for i in range(mat.shape[0]):
+        for j in range(i, length):
+            value = mat[i, j]
+            if ignore_zero and value == 0:
+                continue
+            sums[j - i] += value
+            counts[j - i] += 1
+
+    return sums, counts
+
+
+@lru_cache(maxsize=1)
+def _jit_diags_sum() -> Optional[Callable]:
+    """Compile _diags_sum on first use, None if numba is not installed."""
+    try:
+        import numba
+    except ImportError:  # numba is optional, fallback to numpy implementations.
+        return None
+    # serial on purpose, numba's parallel threading layers are not fork-safe and
+    # callers run chunks in forked process pools.
+    return numba.njit(cache=True)(_diags_sum)
+
+
+def diags_mean(mat: np.ndarray, filter_fn: Callable = None) -> np.ndarray:
+    """Calculate mean value of each upper diagonal.
+
+    :param mat: np.ndarray. 2d square ndarray.
+    :param filter_fn: Callable. Element-wise function applied to mat, should return a mask.
+    :return: np.ndarray. Mean value of each diagonal indexed by offset, nan for empty diagonals.
+    """
+    diags_sum = _jit_diags_sum() if filter_fn in (None, _nonzero) else None
+    if diags_sum is not None:
+        sums, counts = diags_sum(np.ascontiguousarray(mat), filter_fn is not None)
+    else:
+        # diagonal() returns views, so only one diagonal's mask is allocated at a time.
+        length = mat.shape[1]
+        sums = np.empty(length)
+        counts = np.empty(length, dtype=np.int64)
+        for offset in range(length):
+            diag = mat.diagonal(offset)
+            if filter_fn is None:
+                sums[offset], counts[offset] = diag.sum(), diag.size
+            else:
+                valid = filter_fn(diag)
+                sums[offset], counts[offset] = diag.sum(where=valid), np.count_nonzero(valid)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sums / counts
+
+
+@lru_cache(maxsize=32)
+def linear_bins(length: int) -> np.ndarray:
+    """Return read-only bin spans of width 1 covering diagonals in [0, length)."""
+    bins = np.arange(length + 1)
+    bins.flags.writeable = False
+    return bins
+
+
 def get_decay(mat: Union[np.ndarray],
               bin_span: Sequence = None,
               max_diag: int = None,
               func: Callable = np.mean,
-              filter_fn: Callable = partial(np.not_equal, 0.),
+              filter_fn: Callable = _nonzero,
               agg_fn: Callable = np.mean) -> Generator:
     """Calculate mean contact across each diagonal.
 
@@ -149,13 +233,32 @@ def get_decay(mat: Union[np.ndarray],
         raise NotImplementedError('Not implemented')
     length = mat.shape[0]
     if bin_span is None:
-        bin_span = list(range(length + 1))
+        bin_span = linear_bins(length)
     if max_diag is None:
         max_diag = length
-    offsets = range(bin_span[0], bin_span[-1])
-    mean_gen = apply_along_diags(func=func, mat=mat,
-                                 offsets=offsets,
-                                 filter_fn=filter_fn)
+    if func is np.mean and filter_fn in (None, _nonzero):
+        means = diags_mean(mat, filter_fn=filter_fn)[bin_span[0]: bin_span[-1]]
+        if agg_fn is np.mean:
+            # bins are contiguous ranges of diagonals, aggregate all of them with one reduction.
+            bin_span = np.asarray(bin_span)
+            bin_starts, bin_ends = bin_span[:-1], bin_span[1:]
+            valid = bin_starts < max_diag
+            bin_starts, bin_ends = bin_starts[valid], bin_ends[valid]
+            widths = bin_ends - bin_starts
+            if widths.size == 0:
+                return
+            # the last segment of reduceat extends to the end of the array.
+            means = means[: bin_ends[-1] - bin_span[0]]
+            res = np.add.reduceat(means, bin_starts - bin_span[0]) / widths
+            res[np.isnan(res)] = 0
+            yield from np.repeat(res, widths)
+            return
+        mean_gen = iter(means)
+    else:
+        offsets = range(bin_span[0], bin_span[-1])
+        mean_gen = apply_along_diags(func=func, mat=mat,
+                                     offsets=offsets,
+                                     filter_fn=filter_fn)
 
     for st, ed in zip(bin_span[:-1], bin_span[1:]):
         if st >= max_diag:
@@ -176,14 +279,36 @@ def cumsum2d(ma: np.ndarray):
     return summa
 
 
-def eig(mat, vecnum=3):
+def _dense_eigh(mat: np.ndarray, vecnum: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute eigenpairs with the largest magnitude of a dense symmetric matrix through LAPACK.
+    These eigenvalues must lie in the vecnum smallest or the vecnum largest ones.
+    """
+    n = mat.shape[0]
+    if 2 * vecnum >= n:
+        eigvals, eigvecs = linalg.eigh(mat)
+    else:
+        low_vals, low_vecs = linalg.eigh(mat, subset_by_index=[0, vecnum - 1])
+        high_vals, high_vecs = linalg.eigh(mat, subset_by_index=[n - vecnum, n - 1])
+        eigvals = np.r_[low_vals, high_vals]
+        eigvecs = np.c_[low_vecs, high_vecs]
+    order = np.argsort(-np.abs(eigvals))[:vecnum]
+
+    return eigvals[order], eigvecs[:, order]
+
+
+def eig(mat, vecnum=3, symmetric=None):
     """
 
     :param mat:
     :param vecnum:
+    :param symmetric: bool. If the input matrix is symmetric, will be checked when set to None.
     :return:
     """
-    if is_symmetric(mat):
+    if symmetric is None:
+        symmetric = is_symmetric(mat)
+    if symmetric and isinstance(mat, np.ndarray):
+        eigvals, eigvecs = _dense_eigh(mat, vecnum)
+    elif symmetric:
         eigvals, eigvecs = sp_linalg.eigsh(mat, vecnum)
     else:
         eigvals, eigvecs = sp_linalg.eigs(mat, vecnum)
@@ -195,19 +320,44 @@ def eig(mat, vecnum=3):
     return eigvals, eigvecs
 
 
-def pca(mat, vecnum=3):
+def pca(mat, vecnum=3, randomized=False):
     """
 
     :param mat:
     :param vecnum:
+    :param randomized: bool. Use approximate randomized svd when vecnum is small compared to the shape of mat. default: False
     :return:
     """
+    nrow, ncol = mat.shape
     center = mat - np.mean(mat, axis=0)
-    cov = np.dot(center.T, center)
-    eigvals, eigvecs = sp_linalg.eigsh(cov, vecnum)
-    eigvals /= (mat.shape[0] - 1)
+    if nrow >= 4 * ncol:
+        # for tall matrix, eigen decomposition of the small covariance matrix is much cheaper.
+        # syrk only fills the upper triangle of center.T @ center.
+        syrk = linalg.get_blas_funcs('syrk', (center,))
+        cov = syrk(alpha=1., a=center.T)
+        eigvals, eigvecs = linalg.eigh(cov, lower=False, overwrite_a=True,
+                                       subset_by_index=[ncol - vecnum, ncol - 1])
+        eigvals = np.clip(eigvals[::-1], 0, None) / (nrow - 1)
+
+        return eigvals, eigvecs[:, ::-1].T
+
+    if randomized and vecnum < 0.1 * min(nrow, ncol):
+        # only a few leading components are needed, truncated svd costs O(nrow * ncol * vecnum).
+        from sklearn.utils.extmath import randomized_svd
+        _, s, vh = randomized_svd(center, n_components=vecnum, n_oversamples=10, random_state=0)
+    else:
+        # svd of the centered matrix avoids forming the covariance matrix explicitly.
+        # center is a temporary, let LAPACK work in place instead of copying it.
+        _, s, vh = linalg.svd(center, full_matrices=False, overwrite_a=True, lapack_driver='gesdd')
+    eigvals = s[:vecnum] ** 2 / (nrow - 1)
+
+    return eigvals, vh[:vecnum]
 
-    return eigvals[::-1], eigvecs[:, ::-1].T
+
+@lru_cache(maxsize=1024)
+def _int_slice(index: int, length: int) -> slice:
+    """Filled slice of a single integer index, cached since the same indices are looked up repeatedly."""
+    return slice(max(index, 0), min(index + 1, length), 1)
 
 
 class SliceMixin(object):
@@ -215,15 +365,15 @@ class SliceMixin(object):
     @staticmethod
     def _fill_slice(slice_, length):
         if isinstance(slice_, int):
-            start, stop, step = slice_, slice_ + 1, 1
-        else:
-            start, stop, step = slice_.start, slice_.stop, slice_.step
-            if start is None:
-                start = 0
-            if stop is None:
-                stop = length
-            if step is None:
-                step = 1
+            return _int_slice(slice_, length)
+
+        start, stop, step = slice_.start, slice_.stop, slice_.step
+        if start is None:
+            start = 0
+        if stop is None:
+            stop = length
+        if step is None:
+            step = 1
         start = start if (start >= 0) else 0
         stop = stop if (stop <= length) else length
 
@@ -250,11 +400,45 @@ class SliceMixin(object):
 
 
 class Toeplitz(SliceMixin):
-    __slots__ = ('_col', '_row')
+    """Lazily sliced toeplitz matrix defined by its first column and first row.
+    Unit-step slices are read-only views on the underlying 1d arrays, use writeable=True to get copies instead.
+    """
+    __slots__ = ('_col', '_row', '_col_mirror', '_row_mirror', '_writeable')
+
+    def __init__(self, col, row=None, writeable: bool = False):
+        """
 
-    def __init__(self, col, row=None):
+        :param col: np.ndarray. First column of the matrix.
+        :param row: np.ndarray. First row of the matrix, same as col if not set. default: None
+        :param writeable: bool. Return writeable copies instead of read-only views when slicing. default: False
+        """
+        self._writeable = writeable
         self._col = col
         self._row = col if row is None else row
+        # mirror[array.size - 1 + offset] holds the value of the diagonal at offset.
+        self._row_mirror = np.concatenate([self._row[:0:-1], self._row])
+        if row is None:
+            self._col_mirror = self._row_mirror
+        else:
+            self._col_mirror = np.concatenate([self._col[:0:-1], self._col])
+
+    def _strided_window(self, n_diags, height, width):
+        """Expose the window as a read-only strided view of the precomputed mirror array,
+        values are constant along each diagonal. Return None if the window is out of the mirror.
+        """
+        mirror = self._row_mirror if n_diags >= 0 else self._col_mirror
+        center = (mirror.size - 1) // 2 + n_diags
+        st, ed = center - (height - 1), center + width
+        if height == 0 or width == 0 or st < 0 or ed > mirror.size:
+            return None
+        stride = mirror.strides[0]
+
+        return np.lib.stride_tricks.as_strided(
+            mirror[center:],
+            shape=(height, width),
+            strides=(-stride, stride),
+            writeable=False
+        )
 
     def __getitem__(self, items):
         row_slice, col_slice = tuple(self._check_slices(
@@ -268,9 +452,15 @@ class Toeplitz(SliceMixin):
 
         if height == 1 and width == 1:
             array = self._row if n_diags >= 0 else self._col
-            return array[n_diags]
+            return array[abs(n_diags)]
 
-        else:
+        ma = None
+        if row_slice.step == 1 and col_slice.step == 1:
+            ma = self._strided_window(n_diags, height, width)
+            if ma is not None and self._writeable:
+                ma = ma.copy()
+
+        if ma is None:
             if n_diags >= 0:
                 harray = self._row[n_diags: n_diags + width]
                 varray = self._row[:n_diags + 1][::-1][:-1]
@@ -289,11 +479,11 @@ class Toeplitz(SliceMixin):
 
             ma = linalg.toeplitz(varray[::row_slice.step], harray[::col_slice.step])
 
-            return ma.ravel() if ma.size == 1 else ma
+        return ma.ravel() if ma.size == 1 else ma
 
 
 class Expected(Toeplitz):
-    __slots__ = ('_col', '_row')
+    __slots__ = ('_col', '_row', '_col_mirror', '_row_mirror', '_writeable')
 
-    def __init__(self, decay):
-        super().__init__(decay)
+    def __init__(self, decay, writeable: bool = False):
+        super().__init__(decay, writeable=writeable)
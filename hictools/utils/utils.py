@@ -1,14 +1,51 @@
 """Utils for other modules."""
 import re
+import atexit
 import inspect
 import functools
 import logging
 import multiprocessing
 import warnings
-from typing import Callable, Tuple, Union, Iterable, Mapping, Any
-import click
+from typing import Callable, Tuple, Union, Iterable, Mapping, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    import click
 
 CPU_CORE = multiprocessing.cpu_count()
+_POOLS = {}
+
+
+def get_pool(max_workers: int = CPU_CORE) -> 'ProcessPoolExecutor':
+    """Get a process pool shared by all callers with the same number of workers.
+    Workers are started once and reused, the pools are shut down at interpreter exit.
+
+    :param max_workers: int. Number of worker processes. default: CPU_CORE
+    :return: ProcessPoolExecutor.
+    """
+    pool = _POOLS.get(max_workers)
+    if pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = _POOLS[max_workers] = ProcessPoolExecutor(max_workers=max_workers)
+    return pool
+
+
+def drop_pool(max_workers: int = CPU_CORE):
+    """Shut down the shared process pool with the given number of workers, e.g. after one of its workers died.
+    The next get_pool call with the same number of workers creates a new pool.
+
+    :param max_workers: int. Number of worker processes. default: CPU_CORE
+    """
+    pool = _POOLS.pop(max_workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _POOLS.values():
+        pool.shutdown(wait=True)
+    _POOLS.clear()
 
 
 def suppress_warning(func=None, warning_msg=RuntimeWarning):
@@ -29,6 +66,22 @@ def suppress_warning(func=None, warning_msg=RuntimeWarning):
     return inner
 
 
+def lazy_method(func):
+    """Cache results of a method in its instance, keyed by the name of the method and the call arguments.
+    Unlike functools.lru_cache on a method, the cache lives and dies with the instance."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def inner(self, *args, **kwargs):
+        cache = self.__dict__.setdefault('_lazy_cache', {})
+        key = (name, args, tuple(sorted(kwargs.items())))
+        if key not in cache:
+            cache[key] = func(self, *args, **kwargs)
+        return cache[key]
+
+    return inner
+
+
 def parse_docstring(doc: str) -> Iterable[Tuple[str, str, str, str]]:
     """Parsing sphinx style doctring.
 
@@ -85,7 +138,8 @@ def paste_doc(source: Union[str, Callable]):
                 return params[opt]
         return None
 
-    def decorate(target: Union[Callable, click.Command]):
+    def decorate(target: Union[Callable, 'click.Command']):
+        import click
         if not isinstance(target, click.Command):  # copy docstring to another function
             return NotImplemented
 
@@ -0,0 +1,153 @@
+import sys
+
+import numpy as np
+
+sys.path.insert(0, '../')
+
+
+def test_pca():
+    from hictools.utils.numtools import pca
+    rng = np.random.RandomState(0)
+    mat = rng.rand(60, 40)
+    eigvals, eigvecs = pca(mat, vecnum=3)
+    center = mat - mat.mean(axis=0)
+    cov = center.T @ center / (mat.shape[0] - 1)
+    real_eigvals, real_eigvecs = np.linalg.eigh(cov)
+    assert eigvecs.shape == (3, mat.shape[1])
+    assert np.allclose(eigvals, real_eigvals[::-1][:3])
+    assert np.allclose(np.abs(eigvecs), np.abs(real_eigvecs[:, ::-1][:, :3].T))
+
+
+def test_pca_tall():
+    from hictools.utils.numtools import pca
+    rng = np.random.RandomState(0)
+    mat = rng.rand(200, 20)
+    eigvals, eigvecs = pca(mat, vecnum=3)
+    _, s, vh = np.linalg.svd(mat - mat.mean(axis=0), full_matrices=False)
+    assert np.allclose(eigvals, s[:3] ** 2 / (mat.shape[0] - 1))
+    assert np.allclose(np.abs(eigvecs), np.abs(vh[:3]))
+
+
+def test_eig():
+    from hictools.utils.numtools import eig
+    rng = np.random.RandomState(0)
+    mat = rng.rand(50, 50) - 0.5
+    mat = mat + mat.T
+    eigvals, eigvecs = eig(mat, vecnum=3)
+    real_eigvals, real_eigvecs = np.linalg.eigh(mat)
+    order = np.argsort(-np.abs(real_eigvals))[:3]
+    assert eigvecs.shape == (3, mat.shape[0])
+    assert np.allclose(eigvals, real_eigvals[order])
+    assert np.allclose(np.abs(eigvecs), np.abs(real_eigvecs[:, order].T))
+
+
+def test_get_decay():
+    from hictools.utils.numtools import get_decay
+    rng = np.random.RandomState(0)
+    mat = rng.rand(30, 30)
+    mat[mat < 0.3] = 0
+    mat = mat + mat.T
+    bin_span = [0, 1, 2, 4, 8, 16, 30]
+    decay = np.fromiter(get_decay(mat, bin_span=bin_span), dtype=float)
+    diag_means = [np.mean(mat.diagonal(i)[mat.diagonal(i) != 0]) for i in range(30)]
+    real_decay = np.concatenate([
+        np.full(ed - st, np.mean(diag_means[st: ed]))
+        for st, ed in zip(bin_span[:-1], bin_span[1:])
+    ])
+    assert np.allclose(decay, real_decay)
+    decay = np.fromiter(get_decay(mat, bin_span=bin_span, max_diag=8), dtype=float)
+    assert np.allclose(decay, real_decay[:8])
+
+
+def test_pca_truncated():
+    from hictools.utils.numtools import pca
+    rng = np.random.RandomState(0)
+    # low rank structure plus noise, like a compartmentalized correlation matrix.
+    vecs = rng.randn(100, 3) * [10, 5, 2]
+    mat = vecs @ vecs.T + rng.rand(100, 100) * 0.1
+    eigvals, eigvecs = pca(mat, vecnum=3, randomized=True)
+    _, s, vh = np.linalg.svd(mat - mat.mean(axis=0), full_matrices=False)
+    assert np.allclose(eigvals, s[:3] ** 2 / (mat.shape[0] - 1))
+    assert np.allclose(np.abs(eigvecs), np.abs(vh[:3]))
+
+
+def test_toeplitz():
+    from scipy.linalg import toeplitz
+    from hictools.utils.numtools import Toeplitz
+    decay = np.arange(20, dtype=float)
+    real = toeplitz(decay, decay)
+    expected = Toeplitz(decay)
+    assert np.all(expected[:] == real)
+    assert np.all(expected[3:10, 5:18] == real[3:10, 5:18])
+    assert np.all(expected[12:20, 2:9] == real[12:20, 2:9])
+    assert expected[4, 9] == real[4, 9]
+    assert expected[9, 4] == real[9, 4]
+
+
+def test_diags_mean(monkeypatch):
+    from hictools.utils import numtools
+    rng = np.random.RandomState(0)
+    mat = rng.rand(30, 30)
+    mat[mat < 0.3] = 0
+    real_means = [np.mean(mat.diagonal(i)[mat.diagonal(i) != 0]) for i in range(30)]
+    assert np.allclose(numtools.diags_mean(mat, numtools._nonzero), real_means)
+    monkeypatch.setattr(numtools, '_jit_diags_sum', lambda: None)
+    assert np.allclose(numtools.diags_mean(mat, numtools._nonzero), real_means)
+    assert np.allclose(numtools.diags_mean(mat), [np.mean(mat.diagonal(i)) for i in range(30)])
+
+
+def test_is_symmetric():
+    from scipy import sparse
+    from hictools.utils.numtools import is_symmetric
+    rng = np.random.RandomState(0)
+    mat = rng.rand(30, 30)
+    mat[mat < 0.5] = 0
+    sym = mat + mat.T
+    sym[3, 3] = np.nan
+    assert is_symmetric(sym)
+    assert not is_symmetric(mat)
+    assert is_symmetric(np.eye(5, dtype=np.int64))
+    assert not is_symmetric(np.triu(np.ones((5, 5), dtype=np.int64)))
+    assert not is_symmetric(mat[:, :20])
+    assert is_symmetric(sparse.csr_matrix(sym))
+    assert not is_symmetric(sparse.csr_matrix(mat))
+    upper = sparse.triu(sym, k=1)
+    assert not is_symmetric(upper)
+    assert is_symmetric(upper + upper.T)
+
+
+def test_mask_array():
+    from hictools.utils.numtools import mask_array, index_array
+    rng = np.random.RandomState(0)
+    x, mat = rng.rand(10), rng.rand(3, 10)
+    mask = x > 0.5
+    a, (b, c) = mask_array(mask, x, (mat, x))
+    assert np.all(a == x[mask]) and np.all(c == x[mask])
+    assert np.all(b == mat[:, mask])
+    index = np.array([3, 1, 7])
+    a, b = index_array(index, x, mat)
+    assert np.all(a == x[index]) and np.all(b == mat[:, index])
+    a, b = mask_array([], x, mat)
+    assert a.shape == (0,) and b.shape == (3, 0)
+
+
+def test_get_diag():
+    from hictools.utils.numtools import get_diag
+    for shape in ((5, 6), (6, 5), (5, 1), (3, 2)):
+        mat = np.arange(float(np.prod(shape))).reshape(shape)
+        for offset in range(-shape[0] + 1, shape[1]):
+            assert np.all(get_diag(mat, offset) == mat.diagonal(offset))
+    square = np.zeros((4, 4))
+    get_diag(square, -1)[:] = 1
+    assert np.all(square == np.eye(4, k=-1))
+
+
+def test_toeplitz_writeable():
+    import pytest
+    from hictools.utils.numtools import Toeplitz
+    decay = np.arange(20, dtype=float)
+    with pytest.raises(ValueError):
+        Toeplitz(decay)[2:8, 3:9][0, 0] = -1
+    window = Toeplitz(decay, writeable=True)[2:8, 3:9]
+    window[0, 0] = -1
+    assert window[0, 0] == -1 and decay[1] == 1
@@ -13,3 +13,38 @@ def test_get_logger():
     l2 = a()
     assert l2.name == 'test_utils:a'
 
+
+def test_lazy_method():
+    from hictools.utils.utils import lazy_method
+
+    class A(object):
+        def __init__(self):
+            self.ncalls = 0
+
+        @lazy_method
+        def f(self, x, y=1):
+            self.ncalls += 1
+            return x + y
+
+    a, b = A(), A()
+    assert a.f(1) == a.f(1) == 2
+    assert a.f(1, y=2) == 3
+    assert a.ncalls == 2
+    assert b.f(1) == 2 and b.ncalls == 1
+
+
+def test_get_pool():
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+    import pytest
+    from hictools.utils.utils import get_pool, drop_pool
+    pool = get_pool(2)
+    assert get_pool(2) is pool
+    assert list(pool.map(abs, [-1, -2, 3])) == [1, 2, 3]
+    # a dead worker breaks the pool, after dropping it get_pool should hand out a new one.
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result()
+    drop_pool(2)
+    new_pool = get_pool(2)
+    assert new_pool is not pool
+    assert list(new_pool.map(abs, [-1])) == [1]